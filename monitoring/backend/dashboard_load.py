@@ -0,0 +1,409 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, Counter
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
+from fpl_full_ingest import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, connect
+from dashboard_queries import DASHBOARD_DIR, load_panel_queries, load_variable_queries, render
+
+DASHBOARDS = ["fpl-advanced-dashboard.json", "dashboard.json"]
+MONITOR_INTERVAL = 1.0  # seconds between pg_stat_activity / pg_locks polls
+RETRY_DELAY = 1.0  # seconds the ingest/monitor threads back off after an error
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))]
+
+
+class LoadStats:
+    """Thread-safe latency samples (ms) and error counts, keyed by query name."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(list)
+        self.pool_wait = []
+        self.errors = Counter()
+        self.ingest_rows = 0
+        self.activity = []
+
+    def record(self, name, ms, pool_wait_ms=None):
+        with self.lock:
+            self.latency[name].append(ms)
+            if pool_wait_ms is not None:
+                self.pool_wait.append(pool_wait_ms)
+
+    def error(self, name, exc):
+        with self.lock:
+            self.errors[f"{name}: {type(exc).__name__}"] += 1
+
+
+def fetch_choices(conn):
+    """Values a viewer can pick per season: positions, teams and the 100 highest-scoring players."""
+    choices = {}
+    with conn.cursor() as cur:
+        cur.execute("SELECT DISTINCT season FROM fpl_teams ORDER BY season")
+        for (season,) in cur.fetchall():
+            cur.execute("SELECT DISTINCT position FROM fpl_players WHERE season = %s AND position IS NOT NULL", (season,))
+            positions = [r[0] for r in cur.fetchall()]
+            cur.execute("SELECT DISTINCT COALESCE(name, short_name) FROM fpl_teams WHERE season = %s", (season,))
+            teams = [r[0] for r in cur.fetchall()]
+            cur.execute(
+                """
+                SELECT p.web_name
+                FROM fpl_player_gameweek_stats s
+                JOIN fpl_players p ON p.fpl_id = s.fpl_id AND p.season = s.season
+                WHERE s.season = %s
+                GROUP BY p.fpl_id, p.web_name
+                ORDER BY SUM(s.total_points) DESC NULLS LAST
+                LIMIT 100
+                """,
+                (season,),
+            )
+            players = [r[0] for r in cur.fetchall()]
+            if teams and players:
+                choices[season] = {"positions": positions, "teams": teams, "players": players}
+    conn.rollback()
+    return choices
+
+
+def sample_variables(rng, choices):
+    """A plausible viewer selection: mostly the latest season and "All", sometimes narrowed filters."""
+    seasons = sorted(choices)
+    season = seasons[-1] if rng.random() < 0.6 else rng.choice(seasons)
+    c = choices[season]
+    return {
+        "season": season,
+        "position": None if not c["positions"] or rng.random() < 0.5 else rng.sample(c["positions"], min(len(c["positions"]), rng.randint(1, 2))),
+        "team": None if rng.random() < 0.6 else rng.sample(c["teams"], min(len(c["teams"]), rng.randint(1, 3))),
+        "min_minutes": rng.choice([0, 450, 900, 900, 1800]),
+        "topn": rng.choice([10, 15, 15, 25]),
+        "player": rng.choice(c["players"][:20] if rng.random() < 0.7 else c["players"]),
+    }
+
+
+def reconnect(conn, autocommit=False):
+    """conn itself, or a fresh connection if the server dropped it."""
+    if not conn.closed:
+        return conn
+    conn = psycopg2.connect(dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT)
+    conn.autocommit = autocommit
+    return conn
+
+
+def run_query(pool, gate, name, query, stats):
+    """Execute one query on a pooled connection, recording latency and pool wait (ms) or the error."""
+    t_wait = time.perf_counter()
+    with gate:
+        conn = pool.getconn()
+        t0 = time.perf_counter()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(query)
+                cur.fetchall()
+            stats.record(name, (time.perf_counter() - t0) * 1000, (t0 - t_wait) * 1000)
+        except psycopg2.Error as e:
+            stats.error(name, e)
+        finally:
+            pool.putconn(conn)
+
+
+def viewer(idx, pool, gate, variable_queries, panel_queries, choices, think, panel_concurrency, stats, stop):
+    """One simulated dashboard viewer: full refresh, think time, repeat.
+
+    Like Grafana, a refresh runs the template variable queries first and then fires the panel
+    queries concurrently, so one viewer can hold up to panel_concurrency connections at once.
+    """
+    rng = random.Random(idx)
+    stop.wait(rng.uniform(0, think))  # stagger the first refreshes
+    with ThreadPoolExecutor(max_workers=panel_concurrency) as panels:
+        while not stop.is_set():
+            try:
+                variables = sample_variables(rng, choices)
+                t_refresh = time.perf_counter()
+                for name, template in variable_queries:
+                    run_query(pool, gate, name, render(template, variables), stats)
+                futures = [
+                    panels.submit(run_query, pool, gate, name, render(template, variables), stats)
+                    for name, template in panel_queries
+                ]
+                for f in futures:
+                    f.result()
+                stats.record("__refresh__", (time.perf_counter() - t_refresh) * 1000)
+            except Exception as e:
+                # keep the viewer alive; a dead thread would silently undercount throughput
+                stats.error(f"viewer {idx}", e)
+            stop.wait(rng.uniform(0.5, 1.5) * think)
+
+
+def synthetic_ingest(season, page_size, stats, stop):
+    """Re-upsert one season's gameweek rows in pages, like load_gw_stats, until stopped."""
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT fpl_id, season, round, minutes, goals_scored, assists, yellow_cards, red_cards,
+                       bonus, bps, total_points, influence, creativity, threat, ict_index, value, team_id
+                FROM fpl_player_gameweek_stats WHERE season = %s
+                """,
+                (season,),
+            )
+            rows = cur.fetchall()
+        conn.commit()
+    except Exception as e:
+        stats.error("__ingest_season__", e)
+        conn.close()
+        return
+    print(f"  • Synthetic ingest: {len(rows)} rows of {season}, page_size={page_size}")
+    try:
+        while not stop.is_set() and rows:
+            t0 = time.perf_counter()
+            try:
+                conn = reconnect(conn)
+                with conn.cursor() as cur:
+                    execute_values(
+                        cur,
+                        """
+                        INSERT INTO fpl_player_gameweek_stats (
+                            fpl_id, season, round, minutes, goals_scored, assists, yellow_cards, red_cards,
+                            bonus, bps, total_points, influence, creativity, threat, ict_index, value, team_id
+                        )
+                        VALUES %s
+                        ON CONFLICT (fpl_id, season, round) DO UPDATE
+                        SET minutes = EXCLUDED.minutes,
+                            goals_scored = EXCLUDED.goals_scored,
+                            assists = EXCLUDED.assists,
+                            yellow_cards = EXCLUDED.yellow_cards,
+                            red_cards = EXCLUDED.red_cards,
+                            bonus = EXCLUDED.bonus,
+                            bps = EXCLUDED.bps,
+                            total_points = EXCLUDED.total_points,
+                            influence = EXCLUDED.influence,
+                            creativity = EXCLUDED.creativity,
+                            threat = EXCLUDED.threat,
+                            ict_index = EXCLUDED.ict_index,
+                            value = EXCLUDED.value,
+                            team_id = EXCLUDED.team_id;
+                        """,
+                        rows,
+                        page_size=page_size,
+                    )
+                conn.commit()
+                stats.record("__ingest_season__", (time.perf_counter() - t0) * 1000)
+                with stats.lock:
+                    stats.ingest_rows += len(rows)
+            except Exception as e:
+                # count it and keep going (reconnecting if the connection dropped)
+                stats.error("__ingest_season__", e)
+                try:
+                    if not conn.closed:
+                        conn.rollback()
+                except psycopg2.Error:
+                    pass
+                stop.wait(RETRY_DELAY)
+    finally:
+        conn.close()
+
+
+def monitor(stats, stop):
+    """Poll connection states and lock waits for this database once per MONITOR_INTERVAL."""
+    conn = connect()
+    conn.autocommit = True
+    try:
+        while not stop.wait(MONITOR_INTERVAL):
+            try:
+                conn = reconnect(conn, autocommit=True)
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        SELECT count(*),
+                               count(*) FILTER (WHERE state = 'active'),
+                               count(*) FILTER (WHERE state = 'idle in transaction'),
+                               count(*) FILTER (WHERE wait_event_type = 'Lock'),
+                               (SELECT count(*) FROM pg_locks WHERE NOT granted)
+                        FROM pg_stat_activity
+                        WHERE datname = current_database() AND pid <> pg_backend_pid()
+                        """
+                    )
+                    stats.activity.append(cur.fetchone())
+            except Exception as e:
+                # a silently dead monitor would report zero lock waits as if the run were clean
+                stats.error("monitor", e)
+    finally:
+        conn.close()
+
+
+def db_counters(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT xact_commit, xact_rollback, blks_hit, blks_read, deadlocks, temp_files, temp_bytes
+            FROM pg_stat_database WHERE datname = current_database()
+            """
+        )
+        row = cur.fetchone()
+    conn.rollback()
+    keys = ["xact_commit", "xact_rollback", "blks_hit", "blks_read", "deadlocks", "temp_files", "temp_bytes"]
+    return dict(zip(keys, row))
+
+
+def summarize(stats, args, elapsed, db_delta):
+    lat = stats.latency
+    refreshes = lat.pop("__refresh__", [])
+    ingest = lat.pop("__ingest_season__", [])
+    all_q = [ms for samples in lat.values() for ms in samples]
+    activity = stats.activity or [(0, 0, 0, 0, 0)]
+    hits, reads = db_delta["blks_hit"], db_delta["blks_read"]
+    return {
+        "viewers": args.viewers,
+        "pool_size": args.pool_size,
+        "panel_concurrency": args.panel_concurrency,
+        "duration_s": round(elapsed, 1),
+        "ingest": bool(args.with_ingest),
+        "refreshes": len(refreshes),
+        "refreshes_per_s": round(len(refreshes) / elapsed, 2),
+        "queries": len(all_q),
+        "queries_per_s": round(len(all_q) / elapsed, 1),
+        "errors": dict(stats.errors),
+        "refresh_ms": {p: round(pct(refreshes, p), 1) for p in (50, 95, 99)},
+        "query_ms": {p: round(pct(all_q, p), 1) for p in (50, 95, 99, 100)},
+        "pool_wait_ms": {p: round(pct(stats.pool_wait, p), 1) for p in (50, 95, 99, 100)},
+        "per_query_ms": {
+            name: {"count": len(v), "p50": round(pct(v, 50), 1), "p95": round(pct(v, 95), 1), "p99": round(pct(v, 99), 1)}
+            for name, v in sorted(lat.items(), key=lambda kv: pct(kv[1], 95), reverse=True)
+        },
+        "connections": {
+            "max_total": max(a[0] for a in activity),
+            "max_active": max(a[1] for a in activity),
+            "max_idle_in_tx": max(a[2] for a in activity),
+            "max_lock_waits": max(a[3] for a in activity),
+            "max_ungranted_locks": max(a[4] for a in activity),
+            "samples_with_lock_waits": sum(1 for a in activity if a[3]),
+            "samples": len(stats.activity),
+        },
+        "ingest_rows_per_s": round(stats.ingest_rows / elapsed, 1),
+        "ingest_season_ms": {p: round(pct(ingest, p), 1) for p in (50, 95, 100)},
+        "db": dict(db_delta, cache_hit_pct=round(100 * hits / (hits + reads), 2) if hits + reads else None),
+    }
+
+
+def print_report(r):
+    print(f"\n=== {r['viewers']} viewers, pool {r['pool_size']}, {r['panel_concurrency']} panels in parallel, {r['duration_s']}s, ingest {'on' if r['ingest'] else 'off'} ===")
+    print(f"refreshes: {r['refreshes']} ({r['refreshes_per_s']}/s)   queries: {r['queries']} ({r['queries_per_s']}/s)")
+    print(f"refresh ms p50/p95/p99: {r['refresh_ms'][50]} / {r['refresh_ms'][95]} / {r['refresh_ms'][99]}")
+    print(f"query ms   p50/p95/p99/max: {' / '.join(str(v) for v in r['query_ms'].values())}")
+    print(f"pool wait  p50/p95/p99/max: {' / '.join(str(v) for v in r['pool_wait_ms'].values())}")
+    print(f"\n{'count':>7} {'p50':>8} {'p95':>8} {'p99':>8}  query")
+    for name, q in r["per_query_ms"].items():
+        print(f"{q['count']:>7} {q['p50']:>8} {q['p95']:>8} {q['p99']:>8}  {name}")
+    c = r["connections"]
+    print(
+        f"\nconnections: max {c['max_total']} (active {c['max_active']}, idle in tx {c['max_idle_in_tx']}); "
+        f"lock waits: max {c['max_lock_waits']}, ungranted locks max {c['max_ungranted_locks']}, "
+        f"{c['samples_with_lock_waits']} of {c['samples']} samples with waits"
+    )
+    if r["ingest"]:
+        i = r["ingest_season_ms"]
+        print(f"ingest: {r['ingest_rows_per_s']} rows/s, season upsert ms p50/p95/max {i[50]} / {i[95]} / {i[100]}")
+    d = r["db"]
+    print(
+        f"db: {d['xact_commit']} commits, {d['xact_rollback']} rollbacks, {d['deadlocks']} deadlocks, "
+        f"{d['temp_files']} temp files, cache hit {d['cache_hit_pct']}%"
+    )
+    if r["errors"]:
+        print("errors:", r["errors"])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay the Grafana dashboards' SQL from N simulated viewers, optionally during an ingest."
+    )
+    parser.add_argument("--viewers", type=int, default=24)
+    parser.add_argument("--pool-size", type=int, help="shared connections, like Grafana's max_open_conns (default: one per viewer)")
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--think", type=float, default=10, help="mean seconds between a viewer's refreshes")
+    parser.add_argument(
+        "--panel-concurrency", type=int, default=8, help="panel queries a viewer runs in parallel per refresh (1 = one after another)"
+    )
+    parser.add_argument("--with-ingest", action="store_true", help="re-upsert a season in a loop while viewers read")
+    parser.add_argument("--ingest-season", help="season for --with-ingest (default: latest)")
+    parser.add_argument("--ingest-page-size", type=int, default=5000)
+    parser.add_argument("--dashboard-dir", default=DASHBOARD_DIR)
+    parser.add_argument("--out", help="also write the report as JSON here")
+    args = parser.parse_args()
+    args.pool_size = args.pool_size or args.viewers
+
+    variable_queries, panel_queries = [], []
+    for name in DASHBOARDS:
+        path = os.path.join(args.dashboard_dir, name)
+        variable_queries += [(f"var:{v}", q) for v, q in load_variable_queries(path)]
+        panel_queries += load_panel_queries(path)
+    if not panel_queries:
+        print("❌ No SQL panels found in", args.dashboard_dir)
+        sys.exit(1)
+
+    admin = connect()
+    choices = fetch_choices(admin)
+    if not choices:
+        print("❌ No loaded seasons to query; run the ingest first.")
+        sys.exit(1)
+    print(f"✅ {len(variable_queries) + len(panel_queries)} SQL queries, seasons {', '.join(sorted(choices))}")
+
+    pool = ThreadedConnectionPool(
+        1, args.pool_size, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT
+    )
+    gate = threading.BoundedSemaphore(args.pool_size)
+    stats = LoadStats()
+    stop = threading.Event()
+    threads = [threading.Thread(target=monitor, args=(stats, stop), daemon=True)]
+    if args.with_ingest:
+        season = args.ingest_season or max(choices)
+        threads.append(
+            threading.Thread(target=synthetic_ingest, args=(season, args.ingest_page_size, stats, stop), daemon=True)
+        )
+    threads += [
+        threading.Thread(
+            target=viewer,
+            args=(i, pool, gate, variable_queries, panel_queries, choices, args.think, args.panel_concurrency, stats, stop),
+            daemon=True,
+        )
+        for i in range(args.viewers)
+    ]
+
+    before = db_counters(admin)
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    try:
+        stop.wait(args.duration)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    after = db_counters(admin)
+    pool.closeall()
+    admin.close()
+
+    report = summarize(stats, args, elapsed, {k: after[k] - before[k] for k in before})
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📊 Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import re
+import json
+
+DASHBOARD_DIR = os.getenv(
+    "DASHBOARD_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "grafana", "provisioning", "dashboards"),
+)
+VAR_RE = re.compile(r"\$\{(\w+)(?::(\w+))?\}|\$(\w+)")
+
+
+def load_panel_queries(path):
+    """Return [(title, rawSql)] for every SQL target in a Grafana dashboard JSON (row panels included)."""
+    with open(path) as f:
+        dash = json.load(f)
+    out = []
+
+    def walk(panels):
+        for p in panels:
+            walk(p.get("panels", []))
+            for t in p.get("targets", []):
+                if t.get("rawSql"):
+                    out.append((p.get("title", ""), t["rawSql"]))
+
+    walk(dash.get("panels", []))
+    return out
+
+
+def load_variable_queries(path):
+    """Return [(name, query)] for the dashboard's Postgres-backed template variables (run on every load)."""
+    with open(path) as f:
+        dash = json.load(f)
+    out = []
+    for v in dash.get("templating", {}).get("list", []):
+        ds = v.get("datasource")
+        if v.get("type") == "query" and isinstance(ds, dict) and ds.get("type") == "postgres":
+            out.append((v["name"], v["query"]))
+    return out
+
+
+def _literal(v) -> str:
+    return "'" + str(v).replace("'", "''") + "'"
+
+
+def render(template, variables):
+    """Substitute Grafana template variables.
+
+    A list is a multi-value selection and None means "All". ${var:regex} is rendered as a quoted
+    regex literal ('.*' for All); unknown names such as $__timeFilter are left untouched.
+    """
+
+    def sub(m):
+        name, fmt = m.group(1) or m.group(3), m.group(2)
+        if name not in variables:
+            return m.group(0)
+        v = variables[name]
+        if fmt == "regex":
+            if v is None:
+                return _literal(".*")
+            vals = v if isinstance(v, list) else [v]
+            return _literal("(" + "|".join(re.escape(str(x)) for x in vals) + ")")
+        if isinstance(v, list):
+            return ",".join(_literal(x) for x in v)
+        return str(v).replace("'", "''")
+
+    return VAR_RE.sub(sub, template)
+
+
+def default_variables(conn, season) -> dict:
+    """The dashboard's default selection for a season: All positions/teams, 900 min, top 15, top scorer."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT p.web_name
+            FROM fpl_player_gameweek_stats s
+            JOIN fpl_players p ON p.fpl_id = s.fpl_id AND p.season = s.season
+            WHERE s.season = %s
+            GROUP BY p.fpl_id, p.web_name
+            ORDER BY SUM(s.total_points) DESC NULLS LAST
+            LIMIT 1
+            """,
+            (season,),
+        )
+        row = cur.fetchone()
+    conn.rollback()
+    return {
+        "season": season,
+        "position": None,
+        "team": None,
+        "min_minutes": 900,
+        "topn": 15,
+        "player": row[0] if row else "",
+    }
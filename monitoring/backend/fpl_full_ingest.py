@@ -2,11 +2,16 @@ import os
 import sys
 import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_values
 from urllib.request import urlretrieve
 import requests
+from ingest_profiler import IngestProfiler, PROFILE_DIR
+from seasons import current_season, discover_seasons, season_volume, plan_backfill, ensure_season_partitions
+from price_history import record_price_snapshot, apply_price_snapshot
+from migrate import migrate
 
 DB_NAME = os.getenv("DB_NAME", "premier_league")
 DB_USER = os.getenv("DB_USER", "postgres")
@@ -14,16 +19,17 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "1q2w3e4r!")
 DB_HOST = os.getenv("DB_HOST", "postgres")
 DB_PORT = os.getenv("DB_PORT", "5432")
 
-SEASONS_HIST = ["2020-21", "2021-22", "2022-23", "2023-24"]
 DATA_BASE = "/tmp/FPL"
 REPO_BASE_URL = "https://raw.githubusercontent.com/vaastav/Fantasy-Premier-League/master/data"
+SWEEP_REPEATS = 3  # best-of-N per page_size in --sweep-page-size
 
 
-def connect():
+def connect(connection_factory=None):
     while True:
         try:
             conn = psycopg2.connect(
-                dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT
+                dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT,
+                connection_factory=connection_factory,
             )
             conn.autocommit = False
             print("✅ Connected to PostgreSQL.")
@@ -53,7 +59,7 @@ def fetch_csv(url, dest):
     return dest
 
 
-def load_teams(conn, season):
+def read_teams(season) -> list:
     print(f"  • Loading teams {season}…")
     path = fetch_csv(f"{REPO_BASE_URL}/{season}/teams.csv", f"{DATA_BASE}/{season}/teams.csv")
     df = pd.read_csv(path).rename(columns={"id": "team_id"})
@@ -63,7 +69,10 @@ def load_teams(conn, season):
     if after < before:
         print(f"    - Dedup teams: {before} → {after}")
     df["season"] = season
-    rows = df[["team_id", "name", "short_name", "season"]].values.tolist()
+    return df[["team_id", "name", "short_name", "season"]].values.tolist()
+
+
+def upsert_teams(conn, rows, page_size=1000):
     with conn.cursor() as cur:
         execute_values(
             cur,
@@ -74,11 +83,15 @@ def load_teams(conn, season):
             SET name = EXCLUDED.name, short_name = EXCLUDED.short_name;
             """,
             rows,
-            page_size=1000,
+            page_size=page_size,
         )
 
 
-def load_players(conn, season):
+def load_teams(conn, season, page_size=1000):
+    upsert_teams(conn, read_teams(season), page_size=page_size)
+
+
+def read_players(season) -> list:
     print(f"  • Loading players {season}…")
     path = fetch_csv(f"{REPO_BASE_URL}/{season}/players_raw.csv", f"{DATA_BASE}/{season}/players_raw.csv")
     df = pd.read_csv(path)
@@ -90,7 +103,10 @@ def load_players(conn, season):
     if after < before:
         print(f"    - Dedup players: {before} → {after}")
     df["season"] = season
-    rows = df[["id", "web_name", "first_name", "second_name", "position", "team", "season"]].values.tolist()
+    return df[["id", "web_name", "first_name", "second_name", "position", "team", "season"]].values.tolist()
+
+
+def upsert_players(conn, rows, page_size=2000):
     with conn.cursor() as cur:
         execute_values(
             cur,
@@ -105,10 +121,14 @@ def load_players(conn, season):
                 team_id = EXCLUDED.team_id;
             """,
             rows,
-            page_size=2000,
+            page_size=page_size,
         )
 
 
+def load_players(conn, season, page_size=2000):
+    upsert_players(conn, read_players(season), page_size=page_size)
+
+
 def get_team_map(conn, season: str) -> dict:
     """Return mapping fpl_id -> team_id for a given season from DB."""
     with conn.cursor() as cur:
@@ -117,7 +137,8 @@ def get_team_map(conn, season: str) -> dict:
     return {fpl_id: team_id for fpl_id, team_id in rows if team_id is not None}
 
 
-def load_gw_stats(conn, season):
+def read_gw_stats(conn, season) -> list:
+    """merged_gw.csv as upsert rows; team_id is resolved from this season's players, so load those first."""
     print(f"  • Loading gameweeks {season}…")
     path = fetch_csv(f"{REPO_BASE_URL}/{season}/gws/merged_gw.csv", f"{DATA_BASE}/{season}/merged_gw.csv")
     gdf = pd.read_csv(path)
@@ -195,8 +216,10 @@ def load_gw_stats(conn, season):
         "team_id",
         "season",
     ]
-    rows = gdf[use_cols].values.tolist()
+    return gdf[use_cols].values.tolist()
+
 
+def upsert_gw_stats(conn, rows, page_size=5000):
     with conn.cursor() as cur:
         # Note: PK order (fpl_id, season, round)
         execute_values(
@@ -231,33 +254,19 @@ def load_gw_stats(conn, season):
                 team_id = EXCLUDED.team_id;
             """,
             rows,
-            page_size=5000,
+            page_size=page_size,
         )
 
 
-def ingest_historical(conn):
-    for season in SEASONS_HIST:
-        print(f"\n=== Ingesting {season} ===")
-        load_teams(conn, season)
-        conn.commit()
-        load_players(conn, season)
-        conn.commit()
-        load_gw_stats(conn, season)
-        conn.commit()
-        print(f"✅ {season} done.")
-
-
-def guess_current_season():
-    from datetime import datetime
-    now = datetime.utcnow()
-    yr = now.year
-    return f"{yr}-{str(yr + 1)[-2:]}" if now.month >= 7 else f"{yr - 1}-{str(yr)[-2:]}"
+def load_gw_stats(conn, season, page_size=5000):
+    upsert_gw_stats(conn, read_gw_stats(conn, season), page_size=page_size)
 
 
 def update_current(conn):
-    SEASON = guess_current_season()
-    print(f"\n=== Updating current season {SEASON} ===")
     bs = requests.get("https://fantasy.premierleague.com/api/bootstrap-static/").json()
+    SEASON = current_season(bs)
+    print(f"\n=== Updating current season {SEASON} ===")
+    ensure_season_partitions(conn, [SEASON])
 
     # Teams
     t_rows = [(t["id"], t["name"], t["short_name"], SEASON) for t in bs["teams"]]
@@ -302,6 +311,12 @@ def update_current(conn):
         )
     conn.commit()
 
+    # Price / ownership deltas since the last poll
+    changed = record_price_snapshot(conn, SEASON, bs["elements"])
+    conn.commit()
+    apply_price_snapshot(SEASON, changed)
+    print(f"  • Price/ownership changes recorded: {len(changed)} players")
+
     # Finished GWs
     finished = [e for e in bs.get("events", []) if e.get("finished")]
     if not finished:
@@ -371,35 +386,158 @@ def update_current(conn):
         conn.commit()
 
 
-def ingest_historical(conn):
-    for season in SEASONS_HIST:
-        print(f"\n=== Ingesting {season} ===")
-        load_teams(conn, season)
-        conn.commit()
-        load_players(conn, season)
-        conn.commit()
-        load_gw_stats(conn, season)
-        conn.commit()
-        print(f"✅ {season} done.")
+def ingest_season(conn, season) -> float:
+    """Load one season; return the seconds spent on the upserts and commits (downloads and parsing excluded)."""
+    print(f"\n=== Ingesting {season} ===")
+    rows = read_teams(season)
+    t0 = time.perf_counter()
+    upsert_teams(conn, rows)
+    conn.commit()
+    db_s = time.perf_counter() - t0
+    rows = read_players(season)
+    t0 = time.perf_counter()
+    upsert_players(conn, rows)
+    conn.commit()
+    db_s += time.perf_counter() - t0
+    rows = read_gw_stats(conn, season)
+    t0 = time.perf_counter()
+    upsert_gw_stats(conn, rows)
+    conn.commit()
+    db_s += time.perf_counter() - t0
+    print(f"✅ {season} done.")
+    return db_s
+
+
+def ingest_worker(seasons):
+    """Process-pool entry point: one connection, seasons loaded in the planned (largest-first) order."""
+    conn = connect()
+    try:
+        for season in seasons:
+            ingest_season(conn, season)
+    finally:
+        conn.close()
+
+
+def ingest_historical(conn, volumes, workers=1, profiler=None):
+    """Backfill every season in volumes (season -> bytes), largest first, spread over workers."""
+    ensure_season_partitions(conn, volumes)
+    conn.commit()
+    plan = plan_backfill(volumes, workers)
+    if len(plan) <= 1:
+        for season in plan[0] if plan else []:
+            ingest_season(conn, season)
+            if profiler:
+                profiler.snapshot(season)
+    else:
+        for i, seasons in enumerate(plan, 1):
+            mb = sum(volumes[s] for s in seasons) / 2**20
+            print(f"  • Worker {i}: {', '.join(seasons)} ({mb:.1f} MiB)")
+        with ProcessPoolExecutor(max_workers=len(plan)) as pool:
+            for f in [pool.submit(ingest_worker, seasons) for seasons in plan]:
+                f.result()
+    # Fresh planner stats for the new partitions before the dashboards hit them
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE fpl_teams, fpl_players, fpl_player_gameweek_stats")
+    conn.commit()
+
+
+def sweep_page_sizes(conn, season, page_sizes, profiler, repeats=SWEEP_REPEATS):
+    """Time one season's upserts at each page_size; every pass is rolled back so nothing is kept.
+
+    The CSVs are downloaded and parsed once up front, so only the execute_values calls are timed.
+    Expects a SQL-timing-only profiler (explain=False, start(cpu=False)) so the numbers are not
+    inflated by cProfile/tracemalloc. One untimed warm-up pass fills the buffer cache.
+    """
+    print(f"\n=== Sweeping page_size {page_sizes} on {season} ===")
+    ensure_season_partitions(conn, [season])
+    conn.commit()
+    teams = read_teams(season)
+    players = read_players(season)
+    # gameweek rows need this season's players visible for the team_id lookup
+    upsert_teams(conn, teams, page_size=page_sizes[0])
+    upsert_players(conn, players, page_size=page_sizes[0])
+    gw_stats = read_gw_stats(conn, season)
+    upsert_gw_stats(conn, gw_stats, page_size=page_sizes[0])
+    conn.rollback()
+    for page_size in page_sizes:
+        best_sql, best_wall = None, None
+        for _ in range(repeats):
+            sql_before = profiler.sql_seconds()
+            t0 = time.perf_counter()
+            upsert_teams(conn, teams, page_size=page_size)
+            upsert_players(conn, players, page_size=page_size)
+            upsert_gw_stats(conn, gw_stats, page_size=page_size)
+            wall = time.perf_counter() - t0
+            sql = profiler.sql_seconds() - sql_before
+            conn.rollback()
+            if best_sql is None or sql < best_sql:
+                best_sql, best_wall = sql, wall
+        profiler.record_sweep(page_size, best_sql, best_wall)
+        print(f"  • page_size={page_size}: sql {best_sql:.3f}s, wall {best_wall:.3f}s")
+
+
+def historical_volumes(seasons=None) -> dict:
+    """Season -> bytes for the backfill: the pinned --seasons, else every repo season except the current one."""
+    if seasons:
+        volumes = {s: season_volume(s) or 0 for s in seasons}
+    else:
+        volumes = discover_seasons(exclude=current_season())
+    if not volumes:
+        raise RuntimeError("no historical seasons found in the source repo")
+    print(f"📅 Historical seasons: {', '.join(volumes)}")
+    return volumes
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--include-current", action="store_true")
+    parser.add_argument("--profile", action="store_true", help="write a CPU/allocation/SQL profile report for this run")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR)
+    parser.add_argument(
+        "--sweep-page-size",
+        type=lambda v: [int(x) for x in v.split(",")],
+        help="comma-separated page sizes to benchmark (e.g. 500,1000,2000,5000); times SQL only, writes a report and skips the ingest",
+    )
+    parser.add_argument("--sweep-season", help="season to sweep (default: latest historical season)")
+    parser.add_argument(
+        "--seasons",
+        type=lambda v: v.split(","),
+        help="comma-separated historical seasons to load (default: every season in the source repo)",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="parallel ingest processes for the backfill")
     args = parser.parse_args()
-
-    conn = connect()
+    if args.profile and args.workers > 1:
+        # worker processes would inherit the profiler hooks but report nothing back
+        parser.error("--profile only covers the main process; run it with --workers 1")
+
+    profiler = None
+    if args.sweep_page_size:
+        profiler = IngestProfiler("fpl_full_ingest-sweep", out_dir=args.profile_dir, explain=False)
+    elif args.profile:
+        profiler = IngestProfiler("fpl_full_ingest", out_dir=args.profile_dir)
+
+    conn = connect(profiler.connection_factory() if profiler else None)
+    if profiler:
+        profiler.start(cpu=not args.sweep_page_size)
     try:
-        ingest_historical(conn)
-        if args.include_current:
-            update_current(conn)
-        print("\n🎉 Ingestion complete.")
+        migrate(conn)
+        if args.sweep_page_size:
+            season = args.sweep_season or max(historical_volumes(args.seasons))
+            sweep_page_sizes(conn, season, args.sweep_page_size, profiler)
+        else:
+            ingest_historical(conn, historical_volumes(args.seasons), workers=args.workers, profiler=profiler)
+            if args.include_current:
+                update_current(conn)
+            print("\n🎉 Ingestion complete.")
         conn.commit()
     except Exception as e:
         conn.rollback()
         print("❌ Fatal:", e)
         sys.exit(1)
     finally:
+        if profiler:
+            profiler.stop()
+            print(f"📊 Profile report: {profiler.write_report()}")
         conn.close()
 
 
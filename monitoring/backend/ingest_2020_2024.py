@@ -2,12 +2,16 @@ import os
 import sys
 import time
 import json
+import argparse
 import shutil
 import zipfile
 import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_values
 from urllib.request import urlretrieve
+from ingest_profiler import IngestProfiler, PROFILE_DIR
+from seasons import current_season, discover_seasons, ensure_season_partitions
+from migrate import migrate
 
 DB_NAME = os.getenv("DB_NAME", "premier_league")
 DB_USER = os.getenv("DB_USER", "postgres")
@@ -15,15 +19,15 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "1q2w3e4r!")
 DB_HOST = os.getenv("DB_HOST", "postgres")
 DB_PORT = os.getenv("DB_PORT", "5432")
 
-SEASONS = ["2020-21", "2021-22", "2022-23", "2023-24"]
 DATA_BASE = "/tmp/FPL"
 REPO_BASE_URL = "https://raw.githubusercontent.com/vaastav/Fantasy-Premier-League/master/data"  # :contentReference[oaicite:0]{index=0}
 
-def connect():
+def connect(connection_factory=None):
     while True:
         try:
             conn = psycopg2.connect(
-                dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT
+                dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT,
+                connection_factory=connection_factory,
             )
             conn.autocommit = False
             print("✅ Connected to PostgreSQL.")
@@ -169,21 +173,40 @@ def load_gw_stats(conn, season):
         )
 
 def main():
-    conn = connect()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true", help="write a CPU/allocation/SQL profile report for this run")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR)
+    args = parser.parse_args()
+
+    profiler = IngestProfiler("ingest_2020_2024", out_dir=args.profile_dir) if args.profile else None
+    conn = connect(profiler.connection_factory() if profiler else None)
+    if profiler:
+        profiler.start()
     try:
-        for season in SEASONS:
+        migrate(conn)
+        seasons = list(discover_seasons(exclude=current_season()))
+        if not seasons:
+            raise RuntimeError("no historical seasons found in the source repo")
+        ensure_season_partitions(conn, seasons)
+        conn.commit()
+        for season in seasons:
             print(f"\n=== Ingesting {season} ===")
             load_teams(conn, season)
             load_players(conn, season)
             load_gw_stats(conn, season)
             conn.commit()
             print(f"✅ {season} done.")
-        print("\n🎉 All seasons 2020–2024 ingested successfully.")
+            if profiler:
+                profiler.snapshot(season)
+        print(f"\n🎉 All seasons {seasons[0]} → {seasons[-1]} ingested successfully.")
     except Exception as e:
         conn.rollback()
         print("❌ Fatal error:", e)
         sys.exit(1)
     finally:
+        if profiler:
+            profiler.stop()
+            print(f"📊 Profile report: {profiler.write_report()}")
         conn.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,248 @@
+import os
+import io
+import sys
+import re
+import time
+import cProfile
+import pstats
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import datetime
+import psycopg2.extensions
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/FPL/profiles")
+TOP_N = 25
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples for the collapsed stacks
+ACTUAL_ROWS_RE = re.compile(r"actual time=\S+ rows=(\d+) loops=(\d+)")
+CONFLICTING_RE = re.compile(r"Conflicting Tuples: (\d+)")
+
+
+def statement_key(query) -> str:
+    """Collapse a SQL string to a stable key: whitespace-normalized, cut before the VALUES payload."""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", errors="replace")
+    text = " ".join(str(query).split())
+    cut = text.upper().find("VALUES")
+    if cut > 0:
+        text = text[:cut].rstrip(" (")
+    return text[:160]
+
+
+def explained_rows(plan):
+    """Rows an EXPLAIN ANALYZEd INSERT wrote, i.e. the cursor.rowcount it would have had.
+
+    Without RETURNING the top ModifyTable node reports rows=0, so count the rows fed into it
+    (its first child) and drop the ones ON CONFLICT DO NOTHING skipped.
+    """
+    counts = [ACTUAL_ROWS_RE.search(line) for line in plan[1:]]
+    child = next((m for m in counts if m), None)
+    if child is None:
+        return None
+    rows = int(child.group(1)) * int(child.group(2))
+    if any("Conflict Resolution: NOTHING" in line for line in plan):
+        conflicting = next((CONFLICTING_RE.search(line) for line in plan if "Conflicting Tuples" in line), None)
+        if conflicting:
+            rows -= int(conflicting.group(1))
+    return rows
+
+
+class ProfilingCursor(psycopg2.extensions.cursor):
+    """Cursor that times every execute() and EXPLAIN ANALYZEs the first page of each batched INSERT."""
+
+    def execute(self, query, vars=None):
+        profiler = self.connection.profiler
+        key = statement_key(query)
+        # Only INSERT ... VALUES pages: rowcount of an explained statement is the plan's line
+        # count, and one-off INSERT ... SELECT callers (migrate.py) report their rowcount.
+        explain = (
+            profiler.explain
+            and key.upper().startswith("INSERT")
+            and key not in profiler.plans
+            and (b"VALUES" if isinstance(query, bytes) else "VALUES") in query.upper()
+        )
+        t0 = time.perf_counter()
+        if explain:
+            # EXPLAIN ANALYZE runs the statement, so this page is written exactly once.
+            prefix = b"EXPLAIN (ANALYZE, BUFFERS, VERBOSE) " if isinstance(query, bytes) else "EXPLAIN (ANALYZE, BUFFERS, VERBOSE) "
+            super().execute(prefix + query, vars)
+            profiler.plans[key] = [r[0] for r in self.fetchall()]
+            rows = explained_rows(profiler.plans[key])
+        else:
+            super().execute(query, vars)
+            rows = self.rowcount
+        profiler.record_sql(key, time.perf_counter() - t0, rows)
+
+
+class ProfilingConnection(psycopg2.extensions.connection):
+    """Connection that hands out ProfilingCursor and times commits/rollbacks."""
+
+    profiler = None  # set on the per-run subclass built by IngestProfiler.connection_factory()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = ProfilingCursor
+
+    def commit(self):
+        t0 = time.perf_counter()
+        super().commit()
+        self.profiler.record_sql("COMMIT", time.perf_counter() - t0, None)
+
+    def rollback(self):
+        t0 = time.perf_counter()
+        super().rollback()
+        self.profiler.record_sql("ROLLBACK", time.perf_counter() - t0, None)
+
+
+class IngestProfiler:
+    """Collects CPU profiles, stack samples, allocation snapshots and SQL timings for one run."""
+
+    def __init__(self, name, out_dir=PROFILE_DIR, top_n=TOP_N, explain=True):
+        self.name = name
+        self.out_dir = out_dir
+        self.top_n = top_n
+        self.explain = explain
+        self.started_at = datetime.utcnow()
+        self.wall = 0.0
+        self.sql = defaultdict(lambda: {"calls": 0, "total": 0.0, "max": 0.0, "rows": 0})
+        self.plans = {}
+        self.snapshots = []
+        self.sweep = []
+        self.stacks = Counter()
+        self._cprofile = cProfile.Profile()
+        self._prev_snapshot = None
+        self._sampler = None
+        self._target = None
+        self._stop = threading.Event()
+        self._t0 = None
+        self._cpu = False
+
+    # --- wiring -------------------------------------------------------------
+
+    def connection_factory(self):
+        """Return a connection class bound to this profiler, for psycopg2.connect(connection_factory=...)."""
+        return type("BoundProfilingConnection", (ProfilingConnection,), {"profiler": self})
+
+    def start(self, cpu=True):
+        """Start the clock; with cpu=False only SQL is timed (no cProfile, tracemalloc or stack sampler)."""
+        self._cpu = cpu
+        if cpu:
+            tracemalloc.start()
+            self._target = threading.get_ident()
+            self._sampler = threading.Thread(target=self._sample, name="ingest-profiler", daemon=True)
+            self._sampler.start()
+        self._t0 = time.perf_counter()
+        if cpu:
+            self._cprofile.enable()
+
+    def stop(self):
+        if self._cpu:
+            self._cprofile.disable()
+        self.wall = time.perf_counter() - self._t0
+        if self._cpu:
+            self._stop.set()
+            self._sampler.join()
+            self.snapshot("end")
+            tracemalloc.stop()
+
+    # --- collectors ---------------------------------------------------------
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def record_sql(self, key, seconds, rows):
+        s = self.sql[key]
+        s["calls"] += 1
+        s["total"] += seconds
+        s["max"] = max(s["max"], seconds)
+        if rows is not None and rows > 0:
+            s["rows"] += rows
+
+    def sql_seconds(self) -> float:
+        return sum(s["total"] for s in self.sql.values())
+
+    def snapshot(self, label):
+        """Take a tracemalloc snapshot and keep the top-N allocation growth since the previous one."""
+        if not tracemalloc.is_tracing():
+            return
+        snap = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ]
+        )
+        if self._prev_snapshot is None:
+            top = snap.statistics("lineno")[: self.top_n]
+        else:
+            top = snap.compare_to(self._prev_snapshot, "lineno")[: self.top_n]
+        current, peak = tracemalloc.get_traced_memory()
+        self.snapshots.append((label, current, peak, [str(s) for s in top]))
+        self._prev_snapshot = snap
+
+    def record_sweep(self, page_size, sql_seconds, wall_seconds):
+        self.sweep.append((page_size, sql_seconds, wall_seconds))
+
+    # --- report -------------------------------------------------------------
+
+    def write_report(self) -> str:
+        """Write <name>-<timestamp>.txt (summary) and .folded (collapsed stacks); return the .txt path."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"{self.name}-{self.started_at:%Y%m%d-%H%M%S}")
+
+        out = io.StringIO()
+        w = out.write
+        w(f"# {self.name} profile — started {self.started_at:%Y-%m-%d %H:%M:%S} UTC\n")
+        w(f"wall time: {self.wall:.2f}s   sql time: {self.sql_seconds():.2f}s   stack samples: {sum(self.stacks.values())}\n")
+
+        if self._cpu:
+            with open(base + ".folded", "w") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            w(f"collapsed stacks: {base}.folded\n")
+
+            w(f"\n## Top {self.top_n} functions by cumulative time\n")
+            stats = pstats.Stats(self._cprofile, stream=out)
+            stats.sort_stats("cumulative").print_stats(self.top_n)
+            w(f"\n## Top {self.top_n} functions by own time\n")
+            stats.sort_stats("tottime").print_stats(self.top_n)
+
+        w("\n## SQL statements (by total time)\n")
+        w(f"{'calls':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'rows':>9}  statement\n")
+        for key, s in sorted(self.sql.items(), key=lambda kv: kv[1]["total"], reverse=True)[: self.top_n]:
+            mean_ms = s["total"] / s["calls"] * 1000
+            w(f"{s['calls']:>7} {s['total']:>9.3f} {mean_ms:>9.2f} {s['max'] * 1000:>9.2f} {s['rows']:>9}  {key}\n")
+
+        if self.plans:
+            w("\n## EXPLAIN (ANALYZE, BUFFERS) — first page of each upsert\n")
+            for key, plan in self.plans.items():
+                w(f"\n-- {key}\n")
+                for line in plan:
+                    w(f"   {line}\n")
+
+        if self.snapshots:
+            w("\n## Allocation snapshots (top growth since previous snapshot)\n")
+        for label, current, peak, top in self.snapshots:
+            w(f"\n-- {label}: current {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB\n")
+            for line in top:
+                w(f"   {line}\n")
+
+        if self.sweep:
+            w("\n## page_size sweep (rolled back, best of repeats)\n")
+            w(f"{'page_size':>10} {'sql s':>9} {'wall s':>9}\n")
+            best = min(self.sweep, key=lambda r: r[1])
+            for page_size, sql_s, wall_s in sorted(self.sweep):
+                mark = "  ← fastest" if page_size == best[0] else ""
+                w(f"{page_size:>10} {sql_s:>9.3f} {wall_s:>9.3f}{mark}\n")
+
+        with open(base + ".txt", "w") as f:
+            f.write(out.getvalue())
+        return base + ".txt"
@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import psycopg2
+from seasons import ensure_season_partitions
+
+DB_NAME = os.getenv("DB_NAME", "premier_league")
+DB_USER = os.getenv("DB_USER", "postgres")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "1q2w3e4r!")
+DB_HOST = os.getenv("DB_HOST", "postgres")
+DB_PORT = os.getenv("DB_PORT", "5432")
+
+# schema.sql only runs when the pgdata volume is first initialised; these bring an older
+# volume up to the current schema. Every step is idempotent and is applied by the entry points.
+
+STATS_COLUMNS = """
+    fpl_id, round, minutes, goals_scored, assists, yellow_cards, red_cards, bonus, bps, total_points,
+    influence, creativity, threat, ict_index, value, team_id, season
+"""
+
+# Keep in sync with fpl_player_gameweek_stats in schema.sql
+PARTITIONED_STATS_DDL = """
+CREATE TABLE fpl_player_gameweek_stats (
+    fpl_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    minutes INTEGER,
+    goals_scored INTEGER,
+    assists INTEGER,
+    yellow_cards INTEGER,
+    red_cards INTEGER,
+    bonus INTEGER,
+    bps INTEGER,
+    total_points INTEGER,
+    influence NUMERIC,
+    creativity NUMERIC,
+    threat NUMERIC,
+    ict_index NUMERIC,
+    value NUMERIC,
+    team_id INTEGER,
+    season TEXT NOT NULL,
+    PRIMARY KEY (fpl_id, season, round),
+    FOREIGN KEY (fpl_id, season) REFERENCES fpl_players(fpl_id, season),
+    FOREIGN KEY (team_id, season) REFERENCES fpl_teams(team_id, season)
+) PARTITION BY LIST (season);
+CREATE INDEX idx_stats_team ON fpl_player_gameweek_stats (team_id, season);
+"""
+
+# Keep in sync with fpl_player_price_history in schema.sql
+PRICE_HISTORY_DDL = """
+CREATE TABLE IF NOT EXISTS fpl_player_price_history (
+    captured_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    fpl_id INTEGER NOT NULL,
+    transfers_in_event INTEGER,
+    transfers_out_event INTEGER,
+    now_cost SMALLINT,
+    cost_delta SMALLINT,
+    selected_by_percent NUMERIC(4,1),
+    season TEXT NOT NULL,
+    PRIMARY KEY (fpl_id, season, captured_at),
+    FOREIGN KEY (fpl_id, season) REFERENCES fpl_players(fpl_id, season)
+);
+CREATE INDEX IF NOT EXISTS idx_price_hist_cost ON fpl_player_price_history (fpl_id, season, captured_at)
+    INCLUDE (now_cost) WHERE now_cost IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_price_hist_moves ON fpl_player_price_history (captured_at)
+    INCLUDE (fpl_id, season, cost_delta, now_cost) WHERE cost_delta IS NOT NULL;
+CREATE TABLE IF NOT EXISTS fpl_player_price_latest (
+    season TEXT NOT NULL,
+    fpl_id INTEGER NOT NULL,
+    captured_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    now_cost SMALLINT,
+    selected_by_percent NUMERIC(4,1),
+    transfers_in_event INTEGER,
+    transfers_out_event INTEGER,
+    PRIMARY KEY (season, fpl_id),
+    FOREIGN KEY (fpl_id, season) REFERENCES fpl_players(fpl_id, season)
+);
+"""
+
+# One-off seed of the latest-values table from history written before it existed
+SEED_PRICE_LATEST = """
+INSERT INTO fpl_player_price_latest (
+    season, fpl_id, captured_at, now_cost, selected_by_percent, transfers_in_event, transfers_out_event
+)
+SELECT season, fpl_id, max(captured_at),
+       (array_agg(now_cost ORDER BY captured_at DESC) FILTER (WHERE now_cost IS NOT NULL))[1],
+       (array_agg(selected_by_percent ORDER BY captured_at DESC) FILTER (WHERE selected_by_percent IS NOT NULL))[1],
+       (array_agg(transfers_in_event ORDER BY captured_at DESC) FILTER (WHERE transfers_in_event IS NOT NULL))[1],
+       (array_agg(transfers_out_event ORDER BY captured_at DESC) FILTER (WHERE transfers_out_event IS NOT NULL))[1]
+FROM fpl_player_price_history
+GROUP BY season, fpl_id
+ON CONFLICT (season, fpl_id) DO NOTHING
+"""
+
+
+def connect():
+    while True:
+        try:
+            conn = psycopg2.connect(
+                dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT
+            )
+            conn.autocommit = False
+            print("✅ Connected to PostgreSQL.")
+            return conn
+        except Exception as e:
+            print("⏳ Waiting for DB...", e)
+            time.sleep(3)
+
+
+def partition_gameweek_stats(conn):
+    """Turn a plain fpl_player_gameweek_stats (pre-partitioning volume) into the season-partitioned table."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('fpl_player_gameweek_stats')")
+        row = cur.fetchone()
+        if row is None or row[0] == "p":
+            return
+        print("🔧 Migrating fpl_player_gameweek_stats to a season-partitioned table…")
+        cur.execute("ALTER TABLE fpl_player_gameweek_stats RENAME TO fpl_player_gameweek_stats_old")
+        cur.execute("ALTER INDEX fpl_player_gameweek_stats_pkey RENAME TO fpl_player_gameweek_stats_old_pkey")
+        cur.execute("DROP INDEX IF EXISTS idx_stats_team")
+        cur.execute("DROP INDEX IF EXISTS idx_stats_season")
+        cur.execute(PARTITIONED_STATS_DDL)
+        cur.execute("SELECT DISTINCT season FROM fpl_player_gameweek_stats_old")
+        seasons = [r[0] for r in cur.fetchall()]
+    ensure_season_partitions(conn, seasons)
+    with conn.cursor() as cur:
+        cur.execute(
+            f"INSERT INTO fpl_player_gameweek_stats ({STATS_COLUMNS}) SELECT {STATS_COLUMNS} FROM fpl_player_gameweek_stats_old"
+        )
+        moved = cur.rowcount
+        cur.execute("DROP TABLE fpl_player_gameweek_stats_old")
+        cur.execute("ANALYZE fpl_player_gameweek_stats")
+    print(f"  • Moved {moved} rows into {len(seasons)} season partitions")
+
+
+def create_price_history(conn):
+    with conn.cursor() as cur:
+        cur.execute(PRICE_HISTORY_DDL)
+        cur.execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM fpl_player_price_latest)"
+            " AND EXISTS (SELECT 1 FROM fpl_player_price_history)"
+        )
+        if cur.fetchone()[0]:
+            print("🔧 Seeding fpl_player_price_latest from price history…")
+            cur.execute(SEED_PRICE_LATEST)
+
+
+def migrate(conn):
+    """Apply every pending schema migration in one transaction."""
+    try:
+        partition_gameweek_stats(conn)
+        create_price_history(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+if __name__ == "__main__":
+    conn = connect()
+    try:
+        migrate(conn)
+        print("🎉 Schema up to date.")
+    except Exception as e:
+        print("❌ Migration failed:", e)
+        sys.exit(1)
+    finally:
+        conn.close()
@@ -0,0 +1,107 @@
+from psycopg2.extras import execute_values
+
+# bootstrap-static element fields kept per poll, in table column order
+TRACKED = ("now_cost", "selected_by_percent", "transfers_in_event", "transfers_out_event")
+
+# season -> {fpl_id: (now_cost, selected_by_percent, transfers_in_event, transfers_out_event)}
+_last_snapshot = {}
+
+
+def safe_int(v):
+    try:
+        return int(v)
+    except Exception:
+        return None
+
+
+def safe_float(v):
+    try:
+        return float(v)
+    except Exception:
+        return None
+
+
+def load_last_snapshot(conn, season) -> dict:
+    """Each player's latest values (the delta base), read from fpl_player_price_latest by primary key."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT fpl_id, now_cost, selected_by_percent::float8, transfers_in_event, transfers_out_event
+            FROM fpl_player_price_latest
+            WHERE season = %s
+            """,
+            (season,),
+        )
+        return {r[0]: tuple(r[1:]) for r in cur.fetchall()}
+
+
+def record_price_snapshot(conn, season, elements) -> dict:
+    """Append a delta row for every player whose price/ownership/transfers changed; return the new values.
+
+    Unchanged columns are stored as NULL, so a player's price history is just the rows with a
+    non-NULL now_cost. cost_delta is set on real price moves only (not on a player's first row).
+    fpl_player_price_latest is upserted in the same transaction. The returned {fpl_id: values}
+    must be passed to apply_price_snapshot() once the caller has committed.
+    """
+    last = _last_snapshot.get(season)
+    if last is None:
+        last = _last_snapshot[season] = load_last_snapshot(conn, season)
+
+    rows, updates = [], {}
+    for p in elements:
+        prev = last.get(p["id"])
+        cur_vals = (
+            safe_int(p.get("now_cost")),
+            safe_float(p.get("selected_by_percent")),
+            safe_int(p.get("transfers_in_event")),
+            safe_int(p.get("transfers_out_event")),
+        )
+        if prev is not None:
+            # a missing field is "no observation", not a change
+            cur_vals = tuple(o if c is None else c for c, o in zip(cur_vals, prev))
+            if cur_vals == prev:
+                continue
+            delta = tuple(None if c == o else c for c, o in zip(cur_vals, prev))
+            cost_delta = cur_vals[0] - prev[0] if delta[0] is not None and prev[0] is not None else None
+        else:
+            delta, cost_delta = cur_vals, None
+        rows.append((p["id"], season, *delta, cost_delta))
+        updates[p["id"]] = cur_vals
+
+    if rows:
+        with conn.cursor() as cur:
+            execute_values(
+                cur,
+                """
+                INSERT INTO fpl_player_price_history (
+                    fpl_id, season, now_cost, selected_by_percent, transfers_in_event, transfers_out_event, cost_delta
+                )
+                VALUES %s
+                ON CONFLICT (fpl_id, season, captured_at) DO NOTHING;
+                """,
+                rows,
+                page_size=1000,
+            )
+            execute_values(
+                cur,
+                """
+                INSERT INTO fpl_player_price_latest (
+                    fpl_id, season, now_cost, selected_by_percent, transfers_in_event, transfers_out_event
+                )
+                VALUES %s
+                ON CONFLICT (season, fpl_id) DO UPDATE
+                SET now_cost = EXCLUDED.now_cost,
+                    selected_by_percent = EXCLUDED.selected_by_percent,
+                    transfers_in_event = EXCLUDED.transfers_in_event,
+                    transfers_out_event = EXCLUDED.transfers_out_event,
+                    captured_at = now();
+                """,
+                [(fpl_id, season, *vals) for fpl_id, vals in updates.items()],
+                page_size=1000,
+            )
+    return updates
+
+
+def apply_price_snapshot(season, updates):
+    """Move the in-memory delta base forward; call only after the snapshot's transaction committed."""
+    _last_snapshot.setdefault(season, {}).update(updates)
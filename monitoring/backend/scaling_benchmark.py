@@ -0,0 +1,86 @@
+import os
+import csv
+import time
+import argparse
+import statistics
+from fpl_full_ingest import connect, ingest_season
+from seasons import current_season, discover_seasons, ensure_season_partitions
+from migrate import migrate
+from dashboard_queries import DASHBOARD_DIR, load_panel_queries, render, default_variables
+
+
+def time_panels(conn, panels, variables, repeats):
+    """Run each panel query `repeats` times; return [(title, p50_ms, max_ms, rows)]."""
+    results = []
+    for title, template in panels:
+        query = render(template, variables)
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            with conn.cursor() as cur:
+                cur.execute(query)
+                rows = len(cur.fetchall())
+            times.append((time.perf_counter() - t0) * 1000)
+        conn.rollback()
+        results.append((render(title, variables), statistics.median(times), max(times), rows))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load seasons one at a time and record load time + dashboard panel latency after each."
+    )
+    parser.add_argument("--max-seasons", type=int, help="stop after this many seasons (default: all)")
+    parser.add_argument("--repeats", type=int, default=5, help="executions per panel query per step")
+    parser.add_argument("--dashboard", default=os.path.join(DASHBOARD_DIR, "fpl-advanced-dashboard.json"))
+    parser.add_argument("--out", default="/tmp/FPL/scaling.csv")
+    parser.add_argument("--truncate", action="store_true", help="empty the fpl_* tables first (start at 0 seasons)")
+    args = parser.parse_args()
+
+    panels = load_panel_queries(args.dashboard)
+    # Newest first: panels always query the first-loaded season, so the curve shows
+    # how one season's dashboard slows down (or not) as older seasons pile up.
+    seasons = sorted(discover_seasons(exclude=current_season()), reverse=True)[: args.max_seasons]
+
+    conn = connect()
+    migrate(conn)
+    if args.truncate:
+        with conn.cursor() as cur:
+            # every table with a foreign key to fpl_players/fpl_teams must be in the same TRUNCATE
+            cur.execute(
+                "TRUNCATE fpl_player_price_latest, fpl_player_price_history,"
+                " fpl_player_gameweek_stats, fpl_players, fpl_teams"
+            )
+        conn.commit()
+    ensure_season_partitions(conn, seasons)
+    conn.commit()
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    variables = None
+    with open(args.out, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["seasons_loaded", "season", "stats_rows", "load_s", "panel", "p50_ms", "max_ms", "result_rows"])
+        for n, season in enumerate(seasons, 1):
+            # DB phase only: GitHub download time would otherwise dominate the curve
+            load_s = ingest_season(conn, season)
+            with conn.cursor() as cur:
+                cur.execute("ANALYZE fpl_teams, fpl_players, fpl_player_gameweek_stats")
+                cur.execute("SELECT COUNT(*) FROM fpl_player_gameweek_stats")
+                stats_rows = cur.fetchone()[0]
+            conn.commit()
+
+            if variables is None:
+                variables = default_variables(conn, season)
+            results = time_panels(conn, panels, variables, args.repeats)
+            for title, p50, mx, rows in results:
+                out.writerow([n, season, stats_rows, f"{load_s:.3f}", title, f"{p50:.2f}", f"{mx:.2f}", rows])
+            f.flush()
+            total_p50 = sum(r[1] for r in results)
+            print(f"📈 {n} seasons ({stats_rows} rows): load {load_s:.1f}s, all panels p50 {total_p50:.1f} ms")
+
+    conn.close()
+    print(f"🎉 Scaling curve written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 -- Drop old tables if they exist
+DROP TABLE IF EXISTS fpl_player_price_latest CASCADE;
+DROP TABLE IF EXISTS fpl_player_price_history CASCADE;
 DROP TABLE IF EXISTS fpl_player_gameweek_stats CASCADE;
 DROP TABLE IF EXISTS fpl_players CASCADE;
 DROP TABLE IF EXISTS fpl_teams CASCADE;
@@ -26,6 +28,9 @@ CREATE TABLE fpl_players (
 );
 
 -- Player Gameweek Stats (per player, per season, per GW)
+-- List-partitioned by season so dashboard panels (always filtered on one season)
+-- only touch that season's rows. The ingest creates one partition per season,
+-- e.g. fpl_player_gameweek_stats_2023_24, before loading it.
 CREATE TABLE fpl_player_gameweek_stats (
     fpl_id INTEGER NOT NULL,
     round INTEGER NOT NULL,
@@ -47,9 +52,45 @@ CREATE TABLE fpl_player_gameweek_stats (
     PRIMARY KEY (fpl_id, season, round),
     FOREIGN KEY (fpl_id, season) REFERENCES fpl_players(fpl_id, season),
     FOREIGN KEY (team_id, season) REFERENCES fpl_teams(team_id, season)
+) PARTITION BY LIST (season);
+
+-- Price / ownership history from bootstrap-static (append-only, delta-encoded)
+-- One row per player per poll only when something changed; unchanged columns are NULL.
+-- now_cost is in tenths of £m; cost_delta is the price move since the previous stored price.
+CREATE TABLE fpl_player_price_history (
+    captured_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    fpl_id INTEGER NOT NULL,
+    transfers_in_event INTEGER,
+    transfers_out_event INTEGER,
+    now_cost SMALLINT,
+    cost_delta SMALLINT,
+    selected_by_percent NUMERIC(4,1),
+    season TEXT NOT NULL,
+    PRIMARY KEY (fpl_id, season, captured_at),
+    FOREIGN KEY (fpl_id, season) REFERENCES fpl_players(fpl_id, season)
+);
+
+-- Latest full values per player: the delta base for the next poll (one row per player,
+-- upserted in the same transaction as the history rows)
+CREATE TABLE fpl_player_price_latest (
+    season TEXT NOT NULL,
+    fpl_id INTEGER NOT NULL,
+    captured_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    now_cost SMALLINT,
+    selected_by_percent NUMERIC(4,1),
+    transfers_in_event INTEGER,
+    transfers_out_event INTEGER,
+    PRIMARY KEY (season, fpl_id),
+    FOREIGN KEY (fpl_id, season) REFERENCES fpl_players(fpl_id, season)
 );
 
 -- Indexes for performance
-CREATE INDEX idx_stats_season ON fpl_player_gameweek_stats (season);
 CREATE INDEX idx_stats_team   ON fpl_player_gameweek_stats (team_id, season);
 CREATE INDEX idx_players_team ON fpl_players (team_id, season);
+
+-- Price history for one player: index-only scan over that player's price moves
+CREATE INDEX idx_price_hist_cost ON fpl_player_price_history (fpl_id, season, captured_at)
+    INCLUDE (now_cost) WHERE now_cost IS NOT NULL;
+-- Biggest risers/fallers in a time window: index-only range scan over price moves only
+CREATE INDEX idx_price_hist_moves ON fpl_player_price_history (captured_at)
+    INCLUDE (fpl_id, season, cost_delta, now_cost) WHERE cost_delta IS NOT NULL;
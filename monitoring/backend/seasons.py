@@ -0,0 +1,105 @@
+import re
+from datetime import datetime
+import requests
+from psycopg2 import sql
+
+REPO_API_URL = "https://api.github.com/repos/vaastav/Fantasy-Premier-League/contents/data"
+REPO_BASE_URL = "https://raw.githubusercontent.com/vaastav/Fantasy-Premier-League/master/data"
+BOOTSTRAP_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+SEASON_FILES = ["teams.csv", "players_raw.csv", "gws/merged_gw.csv"]
+SEASON_RE = re.compile(r"^\d{4}-\d{2}$")
+FIRST_SEASON_YEAR = 2016  # oldest season in the source repo; start of the year-by-year fallback probe
+
+
+def season_from_year(year: int) -> str:
+    return f"{year}-{str(year + 1)[-2:]}"
+
+
+def guess_season() -> str:
+    now = datetime.utcnow()
+    return season_from_year(now.year if now.month >= 7 else now.year - 1)
+
+
+def current_season(bootstrap=None) -> str:
+    """Current season from the FPL API (first GW deadline); calendar guess if the API is unavailable."""
+    if bootstrap is None:
+        try:
+            r = requests.get(BOOTSTRAP_URL, timeout=30)
+            r.raise_for_status()
+            bootstrap = r.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"⚠ FPL API unavailable ({e}); guessing current season from the calendar")
+            return guess_season()
+    events = bootstrap.get("events") or []
+    if events and events[0].get("deadline_time"):
+        return season_from_year(int(events[0]["deadline_time"][:4]))
+    return guess_season()
+
+
+def season_volume(season: str):
+    """Bytes to download for a season (HEAD on its CSVs), or None if any required file is missing."""
+    total = 0
+    for name in SEASON_FILES:
+        r = requests.head(
+            f"{REPO_BASE_URL}/{season}/{name}", headers={"Accept-Encoding": "identity"}, timeout=30
+        )
+        if r.status_code != 200:
+            return None
+        total += int(r.headers.get("Content-Length", 0))
+    return total
+
+
+def list_repo_seasons() -> list:
+    """Season directory names from the GitHub contents API, or None if it fails (e.g. the 60/h rate limit)."""
+    try:
+        r = requests.get(REPO_API_URL, timeout=30)
+        r.raise_for_status()
+        items = r.json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"⚠ GitHub contents API unavailable ({e}); probing seasons year by year")
+        return None
+    if not isinstance(items, list):
+        print("⚠ Unexpected GitHub contents API response; probing seasons year by year")
+        return None
+    return sorted(i["name"] for i in items if i.get("type") == "dir" and SEASON_RE.match(i["name"]))
+
+
+def discover_seasons(exclude=None) -> dict:
+    """Every loadable season directory in the source repo -> data volume in bytes, oldest first."""
+    names = list_repo_seasons()
+    if names is None:
+        # raw.githubusercontent.com is not rate-limited like the API; season_volume() skips missing years
+        last = int((exclude or guess_season())[:4])
+        names = [season_from_year(y) for y in range(FIRST_SEASON_YEAR, last + 1)]
+    volumes = {}
+    for season in names:
+        if season == exclude:
+            continue
+        size = season_volume(season)
+        if size is None:
+            print(f"  - Skipping {season}: missing {' / '.join(SEASON_FILES)}")
+            continue
+        volumes[season] = size
+    return volumes
+
+
+def plan_backfill(volumes: dict, workers: int) -> list:
+    """Assign seasons to workers largest-first, each to the least-loaded worker (LPT scheduling)."""
+    buckets = [[] for _ in range(max(1, workers))]
+    loads = [0] * len(buckets)
+    for season, size in sorted(volumes.items(), key=lambda kv: kv[1], reverse=True):
+        i = loads.index(min(loads))
+        buckets[i].append(season)
+        loads[i] += size
+    return [b for b in buckets if b]
+
+
+def ensure_season_partitions(conn, seasons):
+    """Create the fpl_player_gameweek_stats partition for each season if it does not exist yet."""
+    with conn.cursor() as cur:
+        for season in seasons:
+            cur.execute(
+                sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF fpl_player_gameweek_stats FOR VALUES IN ({})").format(
+                    sql.Identifier(f"fpl_player_gameweek_stats_{season.replace('-', '_')}"), sql.Literal(season)
+                )
+            )
@@ -1,8 +1,13 @@
 import os
 import time
+import argparse
 import requests
 import psycopg2
 from psycopg2.extras import execute_values
+from ingest_profiler import IngestProfiler, PROFILE_DIR
+from seasons import current_season, ensure_season_partitions
+from price_history import record_price_snapshot, apply_price_snapshot
+from migrate import migrate
 
 DB_NAME = os.getenv("DB_NAME", "premier_league")
 DB_USER = os.getenv("DB_USER", "postgres")
@@ -10,13 +15,12 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "1q2w3e4r!")
 DB_HOST = os.getenv("DB_HOST", "postgres")
 DB_PORT = os.getenv("DB_PORT", "5432")
 
-SEASON = "2024-25"  # update as needed
-
-def connect():
+def connect(connection_factory=None):
     while True:
         try:
             conn = psycopg2.connect(
-                dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT
+                dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT,
+                connection_factory=connection_factory,
             )
             conn.autocommit = False
             print("✅ Connected to PostgreSQL.")
@@ -37,12 +41,16 @@ def safe_float(v):
     except:
         return None
 
-def update_current():
-    conn = connect()
+def update_current(profiler=None):
+    conn = connect(profiler.connection_factory() if profiler else None)
+    migrate(conn)
     cur = conn.cursor()
 
     # Bootstrap to get teams + players
     bootstrap = requests.get("https://fantasy.premierleague.com/api/bootstrap-static/").json()
+    SEASON = current_season(bootstrap)
+    print(f"📅 Current season: {SEASON}")
+    ensure_season_partitions(conn, [SEASON])
 
     # Teams
     team_rows = []
@@ -76,6 +84,12 @@ def update_current():
             team_id = EXCLUDED.team_id;
     """, player_rows)
 
+    # Price / ownership deltas since the last poll
+    changed = record_price_snapshot(conn, SEASON, bootstrap["elements"])
+    conn.commit()
+    apply_price_snapshot(SEASON, changed)
+    print(f"✅ Price/ownership changes recorded: {len(changed)} players")
+
     # Latest finished GW
     finished = [e for e in bootstrap["events"] if e.get("finished")]
     if not finished:
@@ -131,4 +145,17 @@ def update_current():
     print("🎉 Current season updated.")
 
 if __name__ == "__main__":
-    update_current()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true", help="write a CPU/allocation/SQL profile report for this run")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR)
+    args = parser.parse_args()
+
+    profiler = IngestProfiler("update_current_season", out_dir=args.profile_dir) if args.profile else None
+    if profiler:
+        profiler.start()
+    try:
+        update_current(profiler)
+    finally:
+        if profiler:
+            profiler.stop()
+            print(f"📊 Profile report: {profiler.write_report()}")